@@ -1,67 +1,250 @@
 from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
-from datetime import datetime
+from contextlib import asynccontextmanager, contextmanager
 import sqlite3
+import hashlib
+import html
+import threading
+import time
+import queue
 import os
 import re
+import orjson
 
 DB_PATH = "orders.db"
+DB_POOL_SIZE = 5
 
-app = FastAPI(title="Kakao Order System")
+
+class ORJSONResponse(JSONResponse):
+    """orjson 으로 직렬화하는 JSON 응답 (한글도 이스케이프 없이 UTF-8 그대로)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
 
 
 # =========================
 # DB 유틸
 # =========================
+class SQLiteConnectionPool:
+    """
+    sqlite3 커넥션 풀
+    - 요청마다 connect/close 하지 않고 커넥션을 재사용 (페이지 캐시 유지)
+    - 필요할 때 최대 size 개까지 만들고, 다 쓰고 있으면 반납될 때까지 대기
+    """
+
+    def __init__(self, db_path: str, size: int = DB_POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle = queue.Queue(maxsize=size)
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        # FastAPI 스레드풀의 여러 스레드에서 돌려 쓰므로 check_same_thread=False
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # 커넥션 만들 때 한 번만 설정 (WAL: 읽기가 쓰기를 막지 않음)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=134217728")
+        conn.execute("PRAGMA cache_size=-20000")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                conn = self._connect()
+                self._created += 1
+                return conn
+        return self._idle.get()
+
+    def release(self, conn: sqlite3.Connection):
+        # 커밋 안 된 트랜잭션이 남아 있으면 다음 사용자에게 넘어가지 않게 롤백
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                conn.close()
+                self._created -= 1
+
+
+pool = SQLiteConnectionPool(DB_PATH)
+
+
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """풀에서 커넥션 빌려오기: `with get_db() as conn:` 형태로 사용"""
+    return pool.connection()
 
 
 def init_db():
-    conn = get_db()
-    cur = conn.cursor()
-
-    # 상품 테이블
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS products (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT UNIQUE NOT NULL,
-        price INTEGER NOT NULL,
-        base_stock INTEGER NOT NULL DEFAULT 0,
-        is_active INTEGER NOT NULL DEFAULT 1
-    )
-    """)
-
-    # 주문 테이블
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS orders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        phone4 TEXT NOT NULL,
-        created_at TEXT NOT NULL
-    )
-    """)
-
-    # 주문 상세 테이블
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS order_items (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        order_id INTEGER NOT NULL,
-        product_id INTEGER NOT NULL,
-        quantity INTEGER NOT NULL,
-        unit_price INTEGER NOT NULL,
-        FOREIGN KEY(order_id) REFERENCES orders(id),
-        FOREIGN KEY(product_id) REFERENCES products(id)
-    )
-    """)
+    """테이블/인덱스 생성 (import 시점이 아니라 서버 시작 시 lifespan 에서 한 번 실행)"""
+    with get_db() as conn:
+        cur = conn.cursor()
+        # 워커 여러 개가 동시에 띄워져도 스키마 확인/변경이 겹치지 않도록 락을 잡고 진행
+        cur.execute("BEGIN IMMEDIATE")
+
+        # 상품 테이블
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            price INTEGER NOT NULL,
+            base_stock INTEGER NOT NULL DEFAULT 0,
+            is_active INTEGER NOT NULL DEFAULT 1,
+            normalized_name TEXT GENERATED ALWAYS AS (replace(name, ' ', '')) VIRTUAL
+        )
+        """)
+
+        # 예전 DB에는 normalized_name 컬럼이 없으므로 추가
+        cur.execute("PRAGMA table_xinfo(products)")
+        product_columns = {r["name"] for r in cur.fetchall()}
+        if "normalized_name" not in product_columns:
+            cur.execute("""
+            ALTER TABLE products ADD COLUMN normalized_name TEXT
+            GENERATED ALWAYS AS (replace(name, ' ', '')) VIRTUAL
+            """)
+
+        # 주문 테이블
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            phone4 TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )
+        """)
+
+        # 주문 상세 테이블
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price INTEGER NOT NULL,
+            FOREIGN KEY(order_id) REFERENCES orders(id),
+            FOREIGN KEY(product_id) REFERENCES products(id)
+        )
+        """)
 
-    conn.commit()
-    conn.close()
+        # 상품별 주문 합계 테이블 (order_items 트리거로 갱신, 매번 SUM 하지 않도록)
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_stats'"
+        )
+        stats_exists = cur.fetchone() is not None
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS product_stats (
+            product_id INTEGER PRIMARY KEY,
+            total_qty INTEGER NOT NULL DEFAULT 0,
+            total_amount INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY(product_id) REFERENCES products(id)
+        )
+        """)
+        cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_insert
+        AFTER INSERT ON order_items
+        BEGIN
+            INSERT INTO product_stats (product_id, total_qty, total_amount)
+            VALUES (NEW.product_id, NEW.quantity, NEW.quantity * NEW.unit_price)
+            ON CONFLICT(product_id) DO UPDATE SET
+                total_qty = total_qty + excluded.total_qty,
+                total_amount = total_amount + excluded.total_amount;
+        END
+        """)
+        cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_delete
+        AFTER DELETE ON order_items
+        BEGIN
+            UPDATE product_stats SET
+                total_qty = total_qty - OLD.quantity,
+                total_amount = total_amount - OLD.quantity * OLD.unit_price
+            WHERE product_id = OLD.product_id;
+        END
+        """)
+        # 운영 중에 수량/가격/상품을 직접 고친 경우: 예전 값을 빼고 새 값을 더함
+        cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_order_items_update
+        AFTER UPDATE OF quantity, unit_price, product_id ON order_items
+        BEGIN
+            UPDATE product_stats SET
+                total_qty = total_qty - OLD.quantity,
+                total_amount = total_amount - OLD.quantity * OLD.unit_price
+            WHERE product_id = OLD.product_id;
+            INSERT INTO product_stats (product_id, total_qty, total_amount)
+            VALUES (NEW.product_id, NEW.quantity, NEW.quantity * NEW.unit_price)
+            ON CONFLICT(product_id) DO UPDATE SET
+                total_qty = total_qty + excluded.total_qty,
+                total_amount = total_amount + excluded.total_amount;
+        END
+        """)
+        # 테이블을 처음 만든 경우 기존 주문으로 한 번 채움
+        if not stats_exists:
+            cur.execute("""
+            INSERT INTO product_stats (product_id, total_qty, total_amount)
+            SELECT product_id, SUM(quantity), SUM(quantity * unit_price)
+            FROM order_items
+            GROUP BY product_id
+            """)
+
+        # 인덱스: 상품명 조회 / 전화번호별 최근 주문 조회 / 주문 상세 조인
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_products_norm
+        ON products(normalized_name) WHERE is_active = 1
+        """)
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_orders_phone4_created
+        ON orders(phone4, created_at DESC, id DESC)
+        """)
+        cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_items_order
+        ON order_items(order_id)
+        """)
+        # 상품별 합계는 product_stats 가 맡으므로 예전 커버링 인덱스는 삭제
+        # (위의 backfill 이 끝난 뒤에 지워야 backfill 이 이 인덱스를 쓸 수 있음)
+        cur.execute("DROP INDEX IF EXISTS idx_items_product")
+
+        conn.commit()
+
+        # 플래너가 새 인덱스를 고르도록 통계 갱신
+        cur.execute("ANALYZE")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """서버 시작 시 DB 초기화, 종료 시 커넥션 풀 정리"""
+    init_db()
+    yield
+    pool.close()
 
 
-init_db()
+app = FastAPI(
+    title="Kakao Order System",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 
 # =========================
@@ -83,6 +266,40 @@ class ProductUpdate(BaseModel):
 # =========================
 # 헬퍼 함수들
 # =========================
+# 주문 파싱용 정규식 (요청마다 컴파일하지 않도록 미리 컴파일)
+_CHECK_RE = re.compile(r"^\s*(\d{4})\s*주문\s*확인\s*$")
+_ORDER_RE = re.compile(r"^\s*(\d{4})\s*(.+?)\s*(\d+)\s*개?\s*$")
+
+# /products 페이지 캐시: 상품/주문이 바뀌면 버전을 올려서 무효화
+# (다른 워커 프로세스의 변경은 TTL 이 지나야 반영됨)
+PRODUCTS_CACHE_TTL = 5  # 초
+_products_version = 0
+_products_version_lock = threading.Lock()
+_products_cache = {"version": -1, "html": None, "etag": None, "ts": 0.0}
+
+# 상품명 조회 캐시: 상품 추가/수정 시 세대(gen)를 올려서 무효화
+# (다른 워커 프로세스의 변경은 TTL 이 지나야 반영됨)
+PRODUCT_CACHE_TTL = 30  # 초
+_product_cache: Dict[str, tuple] = {}  # product_candidate -> (gen, ts, product_id)
+_product_cache_gen = 0
+_product_cache_lock = threading.Lock()
+
+
+def bump_products_version():
+    """상품/주문 변경 시 호출해서 /products 캐시 무효화"""
+    global _products_version
+    with _products_version_lock:
+        _products_version += 1
+
+
+def invalidate_product_cache():
+    """상품 추가/수정 시 호출해서 상품명 조회 캐시 비우기"""
+    global _product_cache_gen
+    with _product_cache_lock:
+        _product_cache_gen += 1
+        _product_cache.clear()
+
+
 def normalize_name(name: str) -> str:
     """상품명 비교용: 공백 제거 + 양 끝 공백 제거"""
     return name.replace(" ", "").strip()
@@ -99,37 +316,18 @@ def parse_order_text(text: str):
 
     return: (phone4, product_candidate_normalized, quantity) 또는 None
     """
-    raw = text.strip()
-
-    # 1) 전화번호 뒷 4자리 찾기 (처음 등장하는 4자리 숫자)
-    m_phone = re.search(r"(\d{4})", raw)
-    if not m_phone:
+    # 전화번호 4자리 + 상품명 + 수량(뒤에 '개' 있어도 허용)을 한 번에 매칭
+    m = _ORDER_RE.match(text)
+    if not m:
         return None
-    phone4 = m_phone.group(1)
 
-    # 2) 마지막 숫자를 수량으로 (뒤에 '개' 있어도 허용)
-    m_qty = re.search(r"(\d+)\s*개?\s*$", raw)
-    if not m_qty:
-        return None
-    quantity = int(m_qty.group(1))
-
-    # 3) 상품명 부분 뽑기: phone4, quantity, '개' 제거
-    temp = raw
-    # 앞쪽의 phone4 한 번만 제거
-    temp = temp.replace(phone4, "", 1)
-    # 맨 끝의 quantity(+개) 제거
-    qty_pattern = re.compile(rf"{quantity}\s*개?\s*$")
-    temp = qty_pattern.sub("", temp)
-
-    # 남은 '개' 같은 거 혹시 있으면 제거
-    temp = temp.replace("개", "")
-    temp = temp.strip()
+    phone4 = m.group(1)
+    # 공백 제거 버전으로 비교
+    product_candidate = normalize_name(m.group(2))
+    quantity = int(m.group(3))
 
-    if not temp:
+    if not product_candidate:
         return None
-
-    # 공백 제거 버전으로 비교
-    product_candidate = normalize_name(temp)
     return phone4, product_candidate, quantity
 
 
@@ -138,18 +336,8 @@ def is_order_check_text(text: str) -> Optional[str]:
     '1234 주문확인', '1234 주문 확인' 같은 형식 체크
     맞으면 phone4 반환, 아니면 None
     """
-    raw = text.strip()
-    parts = raw.split()
-    if not parts:
-        return None
-
-    # 첫 단어가 4자리 숫자여야 함
-    if re.fullmatch(r"\d{4}", parts[0]):
-        phone4 = parts[0]
-        rest = "".join(parts[1:])
-        if "주문확인" in rest or ("주문" in rest and "확인" in rest):
-            return phone4
-    return None
+    m = _CHECK_RE.match(text)
+    return m.group(1) if m else None
 
 
 def kakao_simple_text(text: str) -> Dict[str, Any]:
@@ -168,24 +356,44 @@ def kakao_simple_text(text: str) -> Dict[str, Any]:
     }
 
 
+# 잘못된 입력에 대한 고정 응답은 미리 JSON bytes 로 만들어 둠
+HELP_MSG = (
+    "주문 형식이 올바르지 않습니다.\n\n"
+    "예시)\n"
+    "1234 콜라제로 2\n"
+    "전화번호뒷4자리 상품이름 수량"
+)
+NOT_FOUND_MSG = (
+    "정확한 상품명을 찾을 수 없습니다.\n"
+    "공지에 적힌 상품 이름을 그대로 입력해 주세요."
+)
+HELP_RESPONSE_BYTES = orjson.dumps(kakao_simple_text(HELP_MSG))
+NOT_FOUND_RESPONSE_BYTES = orjson.dumps(kakao_simple_text(NOT_FOUND_MSG))
+
+
 def build_order_summary_text(phone4: str) -> str:
     """특정 전화번호의 최근 주문 요약 텍스트 생성"""
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT o.created_at,
-               p.name AS product_name,
-               i.quantity,
-               i.unit_price
-        FROM orders o
-        JOIN order_items i ON o.id = i.order_id
-        JOIN products p ON p.id = i.product_id
-        WHERE o.phone4 = ?
-        ORDER BY o.created_at DESC, o.id DESC
-        LIMIT 50
-    """, (phone4,))
-    rows = cur.fetchall()
-    conn.close()
+    with get_db() as conn:
+        cur = conn.cursor()
+        # 최근 주문 50건 id 를 인덱스로 먼저 뽑고 나서 상세/상품을 조인
+        cur.execute("""
+            WITH recent AS (
+                SELECT id, created_at
+                FROM orders
+                WHERE phone4 = ?
+                ORDER BY created_at DESC, id DESC
+                LIMIT 50
+            )
+            SELECT r.created_at,
+                   p.name AS product_name,
+                   i.quantity,
+                   i.unit_price
+            FROM recent r
+            JOIN order_items i ON i.order_id = r.id
+            JOIN products p ON p.id = i.product_id
+            ORDER BY r.created_at DESC, r.id DESC
+        """, (phone4,))
+        rows = cur.fetchall()
 
     if not rows:
         return f"{phone4} 번호로 된 주문이 아직 없습니다."
@@ -205,20 +413,95 @@ def build_order_summary_text(phone4: str) -> str:
     return "\n".join(lines)
 
 
-def get_product_by_normalized_name(product_candidate: str):
+def get_product_id_by_normalized_name(product_candidate: str) -> Optional[int]:
     """
-    상품명 찾기 (is_active=1만 대상)
-    DB에 저장된 name에서 공백 제거 후 비교
+    상품명으로 상품 id 찾기 (is_active=1만 대상)
+    DB에 저장된 name에서 공백 제거한 normalized_name 컬럼과 비교
+    - 이름 -> id 만 메모리에 캐시 (상품 추가/수정 시 무효화)
+    - 가격/판매 여부는 캐시를 믿지 않고 create_order 에서 다시 확인
+      (다른 워커에서 바뀐 값은 이 워커의 캐시에 반영되지 않으므로)
     """
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM products WHERE is_active = 1")
-    rows = cur.fetchall()
-    for r in rows:
-        if normalize_name(r["name"]) == product_candidate:
-            conn.close()
-            return r
-    conn.close()
+    gen = _product_cache_gen
+    cached = _product_cache.get(product_candidate)
+    if cached and cached[0] == gen and time.monotonic() - cached[1] < PRODUCT_CACHE_TTL:
+        return cached[2]
+
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT id
+            FROM products
+            WHERE is_active = 1 AND normalized_name = ?
+            ORDER BY id ASC
+            LIMIT 1
+        """, (product_candidate,))
+        row = cur.fetchone()
+
+    if row is None:
+        # 없는 상품명은 캐시하지 않음 (오타가 쌓여서 캐시가 커지지 않도록)
+        return None
+    _product_cache[product_candidate] = (gen, time.monotonic(), row["id"])
+    return row["id"]
+
+
+def create_order(
+    phone4: str, product_id: int, product_candidate: str, quantity: int
+) -> Optional[sqlite3.Row]:
+    """
+    주문 + 주문 상세 기록
+    - BEGIN IMMEDIATE 로 처음부터 쓰기 락을 잡아서 동시 주문 시 SQLITE_BUSY 방지
+    - 상품명/가격/판매 여부를 같은 트랜잭션 안에서 다시 확인하고, 실제로 기록한 가격으로 주문
+    - 두 INSERT 를 한 트랜잭션(커밋 1번)으로 처리
+
+    return: 주문된 상품 (name, price) 또는 그 id 가 더 이상 이 이름의 판매중 상품이 아니면 None
+    """
+    with get_db() as conn:
+        with conn:  # 성공하면 commit, 예외면 rollback
+            conn.execute("BEGIN IMMEDIATE")
+            product = conn.execute(
+                """
+                SELECT name, price FROM products
+                WHERE id = ? AND normalized_name = ? AND is_active = 1
+                """,
+                (product_id, product_candidate)
+            ).fetchone()
+            if product is None:
+                return None
+
+            # created_at 은 SQLite 에서 로컬 시각으로 생성 (예전 datetime.now().isoformat() 과 같은 형식)
+            cur = conn.execute(
+                """
+                INSERT INTO orders (phone4, created_at)
+                VALUES (?, strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime'))
+                """,
+                (phone4,)
+            )
+            order_id = cur.lastrowid
+            conn.execute(
+                """
+                INSERT INTO order_items (order_id, product_id, quantity, unit_price)
+                VALUES (?, ?, ?, ?)
+                """,
+                (order_id, product_id, quantity, product["price"])
+            )
+    bump_products_version()
+    return product
+
+
+def place_order(phone4: str, product_candidate: str, quantity: int) -> Optional[sqlite3.Row]:
+    """
+    상품명으로 상품을 찾아 주문, 주문된 상품 (name, price) 또는 못 찾으면 None
+    - 캐시된 id 가 오래된 경우 (다른 워커에서 이름 변경/판매 중지 등)
+      캐시를 버리고 DB 에서 한 번만 다시 찾음
+    """
+    for _ in range(2):
+        product_id = get_product_id_by_normalized_name(product_candidate)
+        if product_id is None:
+            return None
+        product = create_order(phone4, product_id, product_candidate, quantity)
+        if product is not None:
+            return product
+        _product_cache.pop(product_candidate, None)
     return None
 
 
@@ -235,58 +518,30 @@ def root():
 # =========================
 @app.post("/kakao/order")
 async def kakao_order(request: Request):
+    # request.json() 때문에 async 핸들러이므로,
+    # 블로킹되는 sqlite 작업은 run_in_threadpool 로 이벤트 루프 밖에서 실행
     body = await request.json()
     user_text = body.get("userRequest", {}).get("utterance", "").strip()
 
     # (1) "1234 주문확인" 처리
     phone4_check = is_order_check_text(user_text)
     if phone4_check:
-        summary = build_order_summary_text(phone4_check)
+        summary = await run_in_threadpool(build_order_summary_text, phone4_check)
         return kakao_simple_text(summary)
 
     # (2) 일반 주문 파싱
     parsed = parse_order_text(user_text)
     if not parsed:
-        help_msg = (
-            "주문 형식이 올바르지 않습니다.\n\n"
-            "예시)\n"
-            "1234 콜라제로 2\n"
-            "전화번호뒷4자리 상품이름 수량"
-        )
-        return kakao_simple_text(help_msg)
+        return Response(HELP_RESPONSE_BYTES, media_type="application/json")
 
     phone4, product_candidate, quantity = parsed
 
-    # (3) 상품 찾기 (이름 정확히 맞추되 공백 무시는 허용)
-    product = get_product_by_normalized_name(product_candidate)
-    if not product:
-        return kakao_simple_text(
-            "정확한 상품명을 찾을 수 없습니다.\n"
-            "공지에 적힌 상품 이름을 그대로 입력해 주세요."
-        )
+    # (3) 상품 찾기 (이름 정확히 맞추되 공백 무시는 허용) + 주문 기록
+    product = await run_in_threadpool(place_order, phone4, product_candidate, quantity)
+    if product is None:
+        return Response(NOT_FOUND_RESPONSE_BYTES, media_type="application/json")
 
-    product_id = product["id"]
     price = product["price"]
-
-    # (4) 주문 기록
-    conn = get_db()
-    cur = conn.cursor()
-    now = datetime.now().isoformat(timespec="seconds")
-    cur.execute(
-        "INSERT INTO orders (phone4, created_at) VALUES (?, ?)",
-        (phone4, now)
-    )
-    order_id = cur.lastrowid
-    cur.execute(
-        """
-        INSERT INTO order_items (order_id, product_id, quantity, unit_price)
-        VALUES (?, ?, ?, ?)
-        """,
-        (order_id, product_id, quantity, price)
-    )
-    conn.commit()
-    conn.close()
-
     total_price = price * quantity
     reply = (
         "[주문 완료]\n"
@@ -302,71 +557,20 @@ async def kakao_order(request: Request):
 # =========================
 # 2. 상품 목록 웹페이지 (사용자용)
 # =========================
-@app.get("/products")
-def show_products():
-    """
-    /products : 공지에 올려둘 상품 목록 링크용
-    - is_active=1 인 상품만 노출
-    - base_stock(총 재고), 주문 수량, 남은 수량 표시
-    """
-    conn = get_db()
-    cur = conn.cursor()
-
-    # active 상품
-    cur.execute("SELECT * FROM products WHERE is_active = 1 ORDER BY id ASC")
-    products = cur.fetchall()
-
-    # 각 상품별 주문 수량 합계
-    cur.execute("""
-        SELECT p.id, p.name,
-               p.price, p.base_stock,
-               IFNULL(SUM(i.quantity), 0) AS ordered_qty
-        FROM products p
-        LEFT JOIN order_items i ON p.id = i.product_id
-        GROUP BY p.id, p.name, p.price, p.base_stock
-        ORDER BY p.id ASC
-    """)
-    summary_rows = cur.fetchall()
-    conn.close()
-
-    summary_map = {r["id"]: r for r in summary_rows}
-
-    rows_html = ""
-    for p in products:
-        s = summary_map.get(p["id"])
-        base_stock = s["base_stock"] if s else p["base_stock"]
-        ordered = s["ordered_qty"] if s else 0
-        remaining = base_stock - ordered if base_stock is not None else None
-        status = "판매중"
-        if base_stock is not None and base_stock > 0 and remaining <= 0:
-            status = "품절"
-        price = p["price"]
-
-        rows_html += f"""
-        <tr>
-          <td>{p['name']}</td>
-          <td>{price}원</td>
-          <td>{base_stock}</td>
-          <td>{ordered}</td>
-          <td>{remaining}</td>
-          <td>{status}</td>
-        </tr>
-        """
-
-    from fastapi.responses import HTMLResponse
-    html = f"""
+# 페이지의 고정 부분 (요청마다 다시 만들지 않도록 상수로)
+_PAGE_HEAD = """
     <!DOCTYPE html>
     <html lang="ko">
     <head>
       <meta charset="UTF-8" />
       <title>상품 목록</title>
       <style>
-        body {{ font-family: sans-serif; padding: 20px; }}
-        table {{ border-collapse: collapse; width: 100%; max-width: 800px; }}
-        th, td {{ border: 1px solid #ccc; padding: 8px; text-align: center; }}
-        th {{ background-color: #f5f5f5; }}
-        h1 {{ margin-bottom: 10px; }}
-        .desc {{ margin-bottom: 20px; color: #555; font-size: 14px; }}
+        body { font-family: sans-serif; padding: 20px; }
+        table { border-collapse: collapse; width: 100%; max-width: 800px; }
+        th, td { border: 1px solid #ccc; padding: 8px; text-align: center; }
+        th { background-color: #f5f5f5; }
+        h1 { margin-bottom: 10px; }
+        .desc { margin-bottom: 20px; color: #555; font-size: 14px; }
       </style>
     </head>
     <body>
@@ -387,13 +591,81 @@ def show_products():
           </tr>
         </thead>
         <tbody>
-          {rows_html}
+          """
+_PAGE_TAIL = """
         </tbody>
       </table>
     </body>
     </html>
     """
-    return HTMLResponse(content=html)
+
+
+def render_products_page() -> str:
+    """
+    /products 페이지 HTML 생성
+    - is_active=1 인 상품만 노출
+    - base_stock(총 재고), 주문 수량, 남은 수량 표시
+    """
+    # active 상품 + 상품별 주문 수량 합계를 한 번에 조회
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT p.id, p.name,
+                   p.price, p.base_stock,
+                   IFNULL(s.total_qty, 0) AS ordered_qty
+            FROM products p
+            LEFT JOIN product_stats s ON p.id = s.product_id
+            WHERE p.is_active = 1
+            ORDER BY p.id ASC
+        """)
+        products = cur.fetchall()
+
+    parts = []
+    for p in products:
+        base_stock = p["base_stock"]
+        ordered = p["ordered_qty"]
+        remaining = base_stock - ordered
+        status = "판매중"
+        if base_stock > 0 and remaining <= 0:
+            status = "품절"
+        price = p["price"]
+
+        parts.append(f"""
+        <tr>
+          <td>{html.escape(p['name'])}</td>
+          <td>{price}원</td>
+          <td>{base_stock}</td>
+          <td>{ordered}</td>
+          <td>{remaining}</td>
+          <td>{status}</td>
+        </tr>
+        """)
+    rows_html = "".join(parts)
+
+    return _PAGE_HEAD + rows_html + _PAGE_TAIL
+
+
+@app.get("/products")
+def show_products(request: Request):
+    """
+    /products : 공지에 올려둘 상품 목록 링크용
+    - 상품/주문이 바뀌지 않았으면 PRODUCTS_CACHE_TTL 동안 캐시된 HTML 반환
+    - ETag 가 같으면 304
+    """
+    global _products_cache
+    cache = _products_cache
+    now = time.monotonic()
+    if cache["version"] != _products_version or now - cache["ts"] >= PRODUCTS_CACHE_TTL:
+        version = _products_version
+        page = render_products_page()
+        etag = '"' + hashlib.md5(page.encode("utf-8")).hexdigest() + '"'
+        cache = {"version": version, "html": page, "etag": etag, "ts": now}
+        _products_cache = cache
+
+    headers = {"ETag": cache["etag"]}
+    if request.headers.get("if-none-match") == cache["etag"]:
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=cache["html"], headers=headers)
 
 
 # =========================
@@ -403,18 +675,16 @@ def show_products():
 @app.get("/admin/products/summary")
 def admin_product_summary():
     """상품별 재고/주문/잔여 수량 요약"""
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT p.id, p.name, p.price, p.base_stock, p.is_active,
-               IFNULL(SUM(i.quantity), 0) AS ordered_qty
-        FROM products p
-        LEFT JOIN order_items i ON p.id = i.product_id
-        GROUP BY p.id, p.name, p.price, p.base_stock, p.is_active
-        ORDER BY p.id ASC
-    """)
-    rows = cur.fetchall()
-    conn.close()
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT p.id, p.name, p.price, p.base_stock, p.is_active,
+                   IFNULL(s.total_qty, 0) AS ordered_qty
+            FROM products p
+            LEFT JOIN product_stats s ON p.id = s.product_id
+            ORDER BY p.id ASC
+        """)
+        rows = cur.fetchall()
 
     result = []
     for r in rows:
@@ -436,31 +706,38 @@ def admin_product_summary():
 @app.post("/admin/products")
 def create_product(p: ProductCreate):
     """상품 추가 (이름, 가격, 총 재고)"""
-    conn = get_db()
-    cur = conn.cursor()
-    try:
-        cur.execute(
-            "INSERT INTO products (name, price, base_stock, is_active) VALUES (?, ?, ?, 1)",
-            (p.name, p.price, p.base_stock)
-        )
-        conn.commit()
-        new_id = cur.lastrowid
-    except sqlite3.IntegrityError:
-        conn.close()
-        return {"success": False, "message": "이미 존재하는 상품 이름입니다."}
-    conn.close()
+    with get_db() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                "INSERT INTO products (name, price, base_stock, is_active) VALUES (?, ?, ?, 1)",
+                (p.name, p.price, p.base_stock)
+            )
+            conn.commit()
+            new_id = cur.lastrowid
+        except sqlite3.IntegrityError:
+            return {"success": False, "message": "이미 존재하는 상품 이름입니다."}
+    invalidate_product_cache()
+    bump_products_version()
     return {"success": True, "id": new_id}
 
 
 @app.get("/admin/products")
 def list_products():
     """전체 상품 목록 (JSON)"""
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM products ORDER BY id ASC")
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None  # sqlite3.Row 대신 튜플로 받아서 바로 dict 생성
+        cur.execute("""
+            SELECT id, name, price, base_stock, is_active
+            FROM products
+            ORDER BY id ASC
+        """)
+        rows = cur.fetchall()
+    return [
+        {"id": t[0], "name": t[1], "price": t[2], "base_stock": t[3], "is_active": t[4]}
+        for t in rows
+    ]
 
 
 @app.patch("/admin/products/{product_id}")
@@ -469,9 +746,6 @@ def update_product(product_id: int, data: ProductUpdate):
     상품 수정 (부분 수정)
     - name / price / base_stock / is_active 중 필요한 것만 보내면 됨
     """
-    conn = get_db()
-    cur = conn.cursor()
-
     updates = []
     params = []
     if data.name is not None:
@@ -488,54 +762,61 @@ def update_product(product_id: int, data: ProductUpdate):
         params.append(1 if data.is_active else 0)
 
     if not updates:
-        conn.close()
         return {"success": False, "message": "변경할 값이 없습니다."}
 
     params.append(product_id)
     sql = f"UPDATE products SET {', '.join(updates)} WHERE id = ?"
-    cur.execute(sql, params)
-    conn.commit()
-    conn.close()
+    with get_db() as conn:
+        conn.execute(sql, params)
+        conn.commit()
+    invalidate_product_cache()
+    bump_products_version()
     return {"success": True}
 
 
 @app.get("/admin/orders/by-phone/{phone4}")
 def admin_orders_by_phone(phone4: str):
     """특정 전화번호의 주문 내역 JSON"""
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT o.id AS order_id, o.phone4, o.created_at,
-               p.name AS product_name,
-               i.quantity, i.unit_price
-        FROM orders o
-        JOIN order_items i ON o.id = i.order_id
-        JOIN products p ON p.id = i.product_id
-        WHERE o.phone4 = ?
-        ORDER BY o.created_at DESC, o.id DESC
-    """, (phone4,))
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute("""
+            SELECT o.id AS order_id, o.phone4, o.created_at,
+                   p.name AS product_name,
+                   i.quantity, i.unit_price
+            FROM orders o
+            JOIN order_items i ON o.id = i.order_id
+            JOIN products p ON p.id = i.product_id
+            WHERE o.phone4 = ?
+            ORDER BY o.created_at DESC, o.id DESC
+        """, (phone4,))
+        rows = cur.fetchall()
+    return [
+        {"order_id": t[0], "phone4": t[1], "created_at": t[2],
+         "product_name": t[3], "quantity": t[4], "unit_price": t[5]}
+        for t in rows
+    ]
 
 
 @app.get("/admin/orders/summary")
 def admin_orders_summary():
     """상품별 총 주문 수량 / 매출 합계"""
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT p.id, p.name,
-               IFNULL(SUM(i.quantity), 0) AS total_qty,
-               IFNULL(SUM(i.quantity * i.unit_price), 0) AS total_amount
-        FROM products p
-        LEFT JOIN order_items i ON p.id = i.product_id
-        GROUP BY p.id, p.name
-        ORDER BY p.id ASC
-    """)
-    rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
-    return rows
+    with get_db() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute("""
+            SELECT p.id, p.name,
+                   IFNULL(s.total_qty, 0) AS total_qty,
+                   IFNULL(s.total_amount, 0) AS total_amount
+            FROM products p
+            LEFT JOIN product_stats s ON p.id = s.product_id
+            ORDER BY p.id ASC
+        """)
+        rows = cur.fetchall()
+    return [
+        {"id": t[0], "name": t[1], "total_qty": t[2], "total_amount": t[3]}
+        for t in rows
+    ]
 
 
 # =========================
@@ -544,4 +825,8 @@ def admin_orders_summary():
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", "8000"))
-    uvicorn.run("main:app", host="0.0.0.0", port=port)
+    # 기본은 워커 1개, 여러 개로 돌릴 배포 환경에서만 WEB_CONCURRENCY 로 늘려서 사용
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # loop/http 는 기본값 "auto" 로 두면 uvicorn[standard] 가 설치한
+    # uvloop / httptools 를 쓸 수 있을 때 알아서 사용함 (Windows 에서는 asyncio 로 대체)
+    uvicorn.run("main:app", host="0.0.0.0", port=port, workers=workers)
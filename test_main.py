@@ -0,0 +1,280 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+def make_client(db_path):
+    """임시 DB 를 쓰는 풀로 바꿔 끼운 TestClient (with 로 열면 init_db 실행)"""
+    main.pool = main.SQLiteConnectionPool(str(db_path))
+    main.invalidate_product_cache()
+    main.bump_products_version()
+    return TestClient(main.app)
+
+
+def order(client, text):
+    r = client.post("/kakao/order", json={"userRequest": {"utterance": text}})
+    assert r.status_code == 200
+    return r.json()["template"]["outputs"][0]["simpleText"]["text"]
+
+
+def sum_order_items(db_path):
+    """product_stats 없이 order_items 를 직접 SUM 한 상품별 합계"""
+    conn = sqlite3.connect(str(db_path))
+    rows = conn.execute("""
+        SELECT p.id, p.name,
+               IFNULL(SUM(i.quantity), 0),
+               IFNULL(SUM(i.quantity * i.unit_price), 0)
+        FROM products p
+        LEFT JOIN order_items i ON p.id = i.product_id
+        GROUP BY p.id, p.name
+        ORDER BY p.id ASC
+    """).fetchall()
+    conn.close()
+    return [
+        {"id": r[0], "name": r[1], "total_qty": r[2], "total_amount": r[3]}
+        for r in rows
+    ]
+
+
+@pytest.fixture
+def restore_pool():
+    original = main.pool
+    yield
+    main.pool = original
+
+
+# =========================
+# 주문 파싱
+# =========================
+@pytest.mark.parametrize("text, expected", [
+    ("1234 콜라제로 2", ("1234", "콜라제로", 2)),
+    ("1234 콜 라 제 로 2개", ("1234", "콜라제로", 2)),
+    ("1234콜라제로2", ("1234", "콜라제로", 2)),
+    ("1234 비타500 2", ("1234", "비타500", 2)),
+    # 상품명 안의 '개' 는 그대로 유지
+    ("1234 개껌 2", ("1234", "개껌", 2)),
+])
+def test_parse_order_text(text, expected):
+    assert main.parse_order_text(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "abc",
+    "1234",
+    "1234 콜라제로",
+    # 전화번호 앞에 다른 글자가 있으면 주문으로 보지 않음
+    "주문 1234 콜라제로 2",
+])
+def test_parse_order_text_rejects(text):
+    assert main.parse_order_text(text) is None
+
+
+# =========================
+# 주문확인
+# =========================
+@pytest.mark.parametrize("text", [
+    "1234 주문확인",
+    "1234 주문 확인",
+    "1234주문확인",
+    "  1234  주문  확인  ",
+])
+def test_is_order_check_text(text):
+    assert main.is_order_check_text(text) == "1234"
+
+
+@pytest.mark.parametrize("text", [
+    "1234 주문 내역 확인",
+    "1234 콜라제로 2",
+    "12 주문확인",
+    "12345 주문확인",
+    "주문확인",
+])
+def test_is_order_check_text_rejects(text):
+    assert main.is_order_check_text(text) is None
+
+
+# =========================
+# 상품별 합계 (product_stats)
+# =========================
+def test_orders_summary_matches_order_items(tmp_path, restore_pool):
+    db_path = tmp_path / "orders.db"
+    with make_client(db_path) as client:
+        client.post("/admin/products", json={"name": "콜라 제로", "price": 1500, "base_stock": 10})
+        client.post("/admin/products", json={"name": "사이다", "price": 1200})
+        order(client, "1234 콜라제로 2")
+        order(client, "1234 콜라제로 3개")
+        order(client, "5678 사이다 1")
+        # 가격이 바뀐 뒤의 주문은 바뀐 가격으로 합계에 들어가야 함
+        client.patch("/admin/products/1", json={"price": 2000})
+        order(client, "5678 콜라제로 1")
+
+        summary = client.get("/admin/orders/summary").json()
+
+    assert summary == sum_order_items(db_path)
+    assert summary[0]["total_qty"] == 6
+    assert summary[0]["total_amount"] == 5 * 1500 + 2000
+
+
+def test_orders_summary_follows_order_item_updates(tmp_path, restore_pool):
+    db_path = tmp_path / "orders.db"
+    with make_client(db_path) as client:
+        client.post("/admin/products", json={"name": "콜라", "price": 1000})
+        client.post("/admin/products", json={"name": "사이다", "price": 1200})
+        order(client, "1234 콜라 2")
+        order(client, "1234 사이다 1")
+
+        # 운영자가 주문 상세를 직접 고친 경우 (수량/가격, 상품 변경)
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("UPDATE order_items SET quantity = 5, unit_price = 900 WHERE id = 1")
+        conn.execute("UPDATE order_items SET product_id = 1 WHERE id = 2")
+        conn.commit()
+        conn.close()
+
+        summary = client.get("/admin/orders/summary").json()
+
+    assert summary == sum_order_items(db_path)
+    assert summary[0]["total_qty"] == 6
+    assert summary[0]["total_amount"] == 5 * 900 + 1200
+    assert summary[1]["total_qty"] == 0
+    assert summary[1]["total_amount"] == 0
+
+
+def test_orders_summary_backfills_existing_db(tmp_path, restore_pool):
+    db_path = tmp_path / "orders.db"
+    # product_stats 가 생기기 전 스키마로 만든 DB
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript("""
+        CREATE TABLE products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            price INTEGER NOT NULL,
+            base_stock INTEGER NOT NULL DEFAULT 0,
+            is_active INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE TABLE orders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            phone4 TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        );
+        CREATE TABLE order_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            product_id INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            unit_price INTEGER NOT NULL
+        );
+        INSERT INTO products (name, price, base_stock) VALUES ('콜라 제로', 1500, 10);
+        INSERT INTO products (name, price, base_stock) VALUES ('사이다', 1200, 0);
+        INSERT INTO orders (phone4, created_at) VALUES ('1234', '2025-01-01T10:00:00');
+        INSERT INTO orders (phone4, created_at) VALUES ('5678', '2025-01-01T11:00:00');
+        INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (1, 1, 4, 1000);
+        INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (2, 1, 1, 1500);
+    """)
+    conn.commit()
+    conn.close()
+
+    with make_client(db_path) as client:
+        assert client.get("/admin/orders/summary").json() == sum_order_items(db_path)
+
+        order(client, "1234 콜라제로 2")
+        order(client, "1234 사이다 1")
+        summary = client.get("/admin/orders/summary").json()
+
+    assert summary == sum_order_items(db_path)
+    assert summary[0]["total_qty"] == 7
+    assert summary[1]["total_qty"] == 1
+
+    # 서버를 다시 띄워도 backfill 이 한 번 더 돌지 않아야 함
+    with make_client(db_path) as client:
+        assert client.get("/admin/orders/summary").json() == summary
+
+
+# =========================
+# 다른 워커에서 바뀐 상품 (캐시가 무효화되지 않은 경우)
+# =========================
+def test_order_uses_current_price_and_availability(tmp_path, restore_pool):
+    db_path = tmp_path / "orders.db"
+    with make_client(db_path) as client:
+        client.post("/admin/products", json={"name": "콜라", "price": 1000})
+        assert "금액: 1000원" in order(client, "1234 콜라 1")  # 상품명 캐시에 올라감
+
+        # 다른 워커가 가격을 바꾼 것처럼 DB 만 직접 수정 (이 워커의 캐시는 그대로)
+        conn = sqlite3.connect(str(db_path))
+        conn.execute("UPDATE products SET price = 5000 WHERE id = 1")
+        conn.commit()
+        assert "금액: 10000원" in order(client, "1234 콜라 2")
+
+        conn.execute("UPDATE products SET is_active = 0 WHERE id = 1")
+        conn.commit()
+        assert "찾을 수 없습니다" in order(client, "1234 콜라 1")
+
+        # 다시 판매하는 콜라를 캐시에 올린 뒤, 다른 워커가 이름을 바꾸고 새 "콜라" 를 등록
+        conn.execute("UPDATE products SET is_active = 1 WHERE id = 1")
+        conn.commit()
+        assert "금액: 5000원" in order(client, "1234 콜라 1")
+        conn.execute("UPDATE products SET name = '펩시', price = 3000 WHERE id = 1")
+        conn.execute("INSERT INTO products (name, price) VALUES ('콜라', 1500)")
+        conn.commit()
+        reply = order(client, "1234 콜라 1")
+        assert "상품: 콜라" in reply
+        assert "금액: 1500원" in reply
+
+        items = conn.execute(
+            "SELECT product_id, unit_price FROM order_items ORDER BY id ASC"
+        ).fetchall()
+        conn.close()
+
+    assert items == [(1, 1000), (1, 5000), (1, 5000), (2, 1500)]
+
+
+# =========================
+# /products 페이지 캐시 (ETag)
+# =========================
+def test_products_page_not_modified(tmp_path, restore_pool):
+    with make_client(tmp_path / "orders.db") as client:
+        client.post("/admin/products", json={"name": "콜라", "price": 1000, "base_stock": 5})
+        first = client.get("/products")
+        etag = first.headers["etag"]
+
+        again = client.get("/products", headers={"If-None-Match": etag})
+
+    assert first.status_code == 200
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["etag"] == etag
+
+
+def test_products_page_refreshes_after_writes(tmp_path, restore_pool):
+    with make_client(tmp_path / "orders.db") as client:
+        client.post("/admin/products", json={"name": "콜라", "price": 1000, "base_stock": 5})
+        etag = client.get("/products").headers["etag"]
+
+        # 주문이 들어오면 같은 ETag 로 물어봐도 새 페이지
+        order(client, "1234 콜라 2")
+        after_order = client.get("/products", headers={"If-None-Match": etag})
+        assert after_order.status_code == 200
+        assert after_order.headers["etag"] != etag
+        assert "<td>2</td>" in after_order.text  # 주문된 수량
+        assert "<td>3</td>" in after_order.text  # 남은 수량
+
+        # 상품 수정도 마찬가지
+        etag = after_order.headers["etag"]
+        client.patch("/admin/products/1", json={"base_stock": 2})
+        after_patch = client.get("/products", headers={"If-None-Match": etag})
+
+    assert after_patch.status_code == 200
+    assert after_patch.headers["etag"] != etag
+    assert "<td>0</td>" in after_patch.text  # 남은 수량
+    assert "품절" in after_patch.text
+
+
+def test_products_page_escapes_names(tmp_path, restore_pool):
+    with make_client(tmp_path / "orders.db") as client:
+        client.post("/admin/products", json={"name": "<b>콜라</b>", "price": 1000})
+        page = client.get("/products").text
+
+    assert "&lt;b&gt;콜라&lt;/b&gt;" in page
+    assert "<b>콜라</b>" not in page